@@ -2,6 +2,26 @@ import requests
 import yaml
 import sys
 import shutil
+import tempfile
+import argparse
+import os
+import json
+import time
+import hashlib
+import struct
+import socket
+import ssl
+import threading
+import tracemalloc
+import cProfile
+import pstats
+import select
+import ctypes
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from collections import OrderedDict, defaultdict
@@ -9,6 +29,12 @@ from copy import deepcopy
 
 VERSION = "beta2509121700"
 
+# Scheduler mode: wake up slightly after a transition and never poll more often than this
+SCHEDULE_MARGIN = timedelta(seconds=5)
+SCHEDULE_MIN_SLEEP = 60
+# ...and retry this soon after a failed run
+SCHEDULE_RETRY = timedelta(minutes=5)
+
 # ANSI color codes
 GREEN = '\033[32m'
 ORANGE = '\033[33m'
@@ -17,6 +43,46 @@ RED = '\033[31m'
 RESET = '\033[0m'
 BOLD = '\033[1m'
 
+SCRIPT_DIR = Path(__file__).parent
+
+# Placeholders are copied to a temporary name first and renamed into place when complete
+PARTIAL_SUFFIX = '.umfk-partial'
+FINGERPRINT_CHUNK = 64 * 1024
+
+# Radarr movie fields kept in the delta sync snapshot
+SNAPSHOT_FIELDS = ('id', 'title', 'year', 'tmdbId', 'imdbId', 'path', 'folderName', 'monitored', 'hasFile',
+                   'digitalRelease', 'physicalRelease', 'inCinemas')
+
+# Watch mode: extensions that count as a downloaded movie, and the inotify(7) flags used
+VIDEO_EXTENSIONS = {'.mkv', '.mp4', '.m4v', '.avi', '.mov', '.wmv', '.ts', '.m2ts', '.mpg', '.mpeg', '.webm'}
+# Plex local extras (e.g. "Movie (2026)-trailer.mp4") and samples, which don't mean the movie arrived
+EXTRAS_SUFFIXES = ('-trailer', '-sample', '-featurette', '-behindthescenes', '-deleted', '-interview',
+                   '-scene', '-short', '-other')
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+INOTIFY_EVENT = struct.Struct('iIII')
+
+class UMFKError(Exception):
+    """Base class for errors raised by UMFK"""
+
+class ConfigError(UMFKError):
+    """Config file is missing or invalid"""
+
+class RadarrError(UMFKError, ConnectionError):
+    """Radarr could not be reached or returned an error"""
+
+class VideoFileError(UMFKError):
+    """UMFK placeholder video file is missing"""
+
 def check_for_updates():
     print(f"Checking for updates to UMFK {VERSION}...")
     
@@ -45,19 +111,121 @@ def check_for_updates():
     except Exception as e:
         print(f"{ORANGE}Could not check for updates: {str(e)}{RESET}\n")
 
+class HttpTimings:
+    """Collects a DNS/connect/TLS/TTFB/download breakdown of Radarr requests when enabled
+
+    requests doesn't expose these phases, so DNS, connect and TLS are measured with a
+    separate probe connection to the same host. TTFB is the time requests needed to
+    receive the response headers, minus the probe phases.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.records = []
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Forget the recorded requests, e.g. between scheduled runs"""
+        with self._lock:
+            self.records = []
+
+    def get(self, url, headers=None, params=None, timeout=10):
+        parts = urlsplit(url)
+        https = parts.scheme == 'https'
+        port = parts.port or (443 if https else 80)
+        timing = {'url': url}
+        
+        try:
+            start = time.perf_counter()
+            addresses = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+            timing['dns'] = time.perf_counter() - start
+            
+            family, sock_type, proto, _, address = addresses[0]
+            start = time.perf_counter()
+            with socket.socket(family, sock_type, proto) as sock:
+                sock.settimeout(timeout)
+                sock.connect(address)
+                timing['connect'] = time.perf_counter() - start
+                
+                timing['tls'] = 0.0
+                if https:
+                    start = time.perf_counter()
+                    try:
+                        ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname).close()
+                        timing['tls'] = time.perf_counter() - start
+                    except ssl.SSLError:
+                        # e.g. a self-signed certificate, leave the TLS phase out of the breakdown
+                        pass
+        except OSError as e:
+            raise requests.exceptions.ConnectionError(e)
+        
+        start = time.perf_counter()
+        response = requests.get(url, headers=headers, params=params, timeout=timeout, stream=True)
+        headers_received = response.elapsed.total_seconds()
+        content = response.content
+        
+        timing['status'] = response.status_code
+        timing['ttfb'] = max(0.0, headers_received - timing['dns'] - timing['connect'] - timing['tls'])
+        timing['download'] = max(0.0, time.perf_counter() - start - headers_received)
+        timing['bytes'] = len(content)
+        with self._lock:
+            self.records.append(timing)
+        return response
+
+http_timings = HttpTimings()
+
+def radarr_get(url, api_key, params=None, timeout=10):
+    """GET a Radarr API url, recording its timing breakdown if enabled"""
+    headers = {"X-Api-Key": api_key}
+    if http_timings.enabled:
+        return http_timings.get(url, headers, params, timeout)
+    return requests.get(url, headers=headers, params=params, timeout=timeout)
+
 def load_config(file_path=None):
     """Load configuration from YAML file"""
     if file_path is None:
-        file_path = Path(__file__).parent / 'config' / 'config.yml'
+        file_path = SCRIPT_DIR / 'config' / 'config.yml'
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
-            return yaml.safe_load(file)
+            return yaml.safe_load(file) or {}
     except FileNotFoundError:
-        print(f"Config file '{file_path}' not found.")
-        sys.exit(1)
+        raise ConfigError(f"Config file '{file_path}' not found.")
     except yaml.YAMLError as e:
-        print(f"Error parsing YAML config file: {e}")
-        sys.exit(1)
+        raise ConfigError(f"Error parsing YAML config file: {e}")
+
+def get_settings(config):
+    """Read the general settings from the config, applying defaults"""
+    return {
+        'future_days_upcoming_movies': config.get('future_days_upcoming_movies', 30),
+        'utc_offset': float(config.get('utc_offset', 0)),
+        'future_only': str(config.get("future_only", "false")).lower() == "true",
+        'include_inCinemas': str(config.get("include_inCinemas", "false")).lower() == "true",
+        'cleanup': str(config.get("cleanup", "true")).lower() == "true",
+        'debug': str(config.get("debug", "false")).lower() == "true",
+        'pipelined': str(config.get("pipelined", "false")).lower() == "true",
+        'delta_sync': str(config.get("delta_sync", "false")).lower() == "true",
+        'full_resync_hours': float(config.get('full_resync_hours', 24)),
+    }
+
+def get_placeholder_video_settings(config):
+    """Read the placeholder_video section of the config, applying defaults"""
+    section = config.get('placeholder_video') or {}
+    resolution = str(section.get('resolution', '1280x720')).lower()
+    try:
+        width, height = (int(value) for value in resolution.split('x'))
+        duration = int(section.get('duration', 10))
+    except ValueError:
+        raise ConfigError(f"Invalid placeholder_video settings: resolution '{resolution}' should look like 1280x720, duration should be a number of seconds")
+    if width < 16 or height < 16 or width > 4096 or height > 2304 or width % 2 or height % 2:
+        raise ConfigError(f"Invalid placeholder_video resolution '{resolution}': use even sizes between 16x16 and 4096x2304")
+    if duration < 1:
+        raise ConfigError("Invalid placeholder_video duration: use at least 1 second")
+    return {
+        'generate': str(section.get('generate', 'false')).lower() == "true",
+        'width': width,
+        'height': height,
+        'duration': duration,
+    }
 
 def process_radarr_url(base_url, api_key):
     """Process and validate Radarr URL"""
@@ -77,8 +245,7 @@ def process_radarr_url(base_url, api_key):
     for path in api_paths:
         test_url = f"{base_url}{path}"
         try:
-            headers = {"X-Api-Key": api_key}
-            response = requests.get(f"{test_url}/health", headers=headers, timeout=10)
+            response = radarr_get(f"{test_url}/health", api_key)
             if response.status_code == 200:
                 print(f"Successfully connected to Radarr at: {test_url}")
                 return test_url
@@ -86,7 +253,7 @@ def process_radarr_url(base_url, api_key):
             print(f"{ORANGE}Testing URL {test_url} - Failed: {str(e)}{RESET}")
             continue
     
-    raise ConnectionError(f"{RED}Unable to establish connection to Radarr. Tried the following URLs:\n" + 
+    raise RadarrError(f"{RED}Unable to establish connection to Radarr. Tried the following URLs:\n" + 
                         "\n".join([f"- {base_url}{path}" for path in api_paths]) + 
                         f"\nPlease verify your URL and API key and ensure Radarr is running.{RESET}")
 
@@ -94,13 +261,48 @@ def get_radarr_movies(radarr_url, api_key):
     """Get all movies from Radarr"""
     try:
         url = f"{radarr_url}/movie"
-        headers = {"X-Api-Key": api_key}
-        response = requests.get(url, headers=headers, timeout=10)
+        response = radarr_get(url, api_key)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
-        print(f"{RED}Error connecting to Radarr: {str(e)}{RESET}")
-        sys.exit(1)
+        raise RadarrError(f"Error connecting to Radarr: {str(e)}")
+
+def get_radarr_movie(radarr_url, api_key, movie_id):
+    """Get a single movie from Radarr, or None if it no longer exists"""
+    try:
+        response = radarr_get(f"{radarr_url}/movie/{movie_id}", api_key)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException as e:
+        raise RadarrError(f"Error connecting to Radarr: {str(e)}")
+
+def get_radarr_history_since(radarr_url, api_key, since):
+    """Get all Radarr history records since a datetime"""
+    try:
+        response = radarr_get(f"{radarr_url}/history/since", api_key, params={'date': since.isoformat()})
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException as e:
+        raise RadarrError(f"Error connecting to Radarr: {str(e)}")
+
+def load_state(path):
+    """Load a JSON state file, or None if it doesn't exist or can't be read"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_state(path, data):
+    """Write a JSON state file atomically"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + PARTIAL_SUFFIX)
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
 
 def convert_utc_to_local(utc_date_str, utc_offset):
     """Convert UTC datetime to local time with offset"""
@@ -156,22 +358,91 @@ def sanitize_filename(filename):
     
     return sanitized
 
-def find_upcoming_movies(radarr_url, api_key, future_days_upcoming_movies, utc_offset=0, future_only=False, include_inCinemas=False, debug=False):
-    """Find movies that are monitored and meet release date criteria"""
+def get_coming_soon_path(movie, path_mappings):
+    """Get the Coming Soon folder path for a Radarr movie, or None if it has no path"""
+    movie_path = movie.get('path')
+    if not movie_path:
+        return None
+    
+    mapped_path = map_path(movie_path, path_mappings)
+    parent_dir = Path(mapped_path).parent
+    
+    # Use new naming convention with sanitization
+    movie_title = movie.get('title', 'Unknown')
+    movie_year = movie.get('year', '')
+    folder_name = sanitize_filename(f"{movie_title} ({movie_year}) {{edition-Coming Soon}}")
+    return parent_dir / folder_name
+
+def get_release_date(movie, include_inCinemas=False):
+    """Get the (release date string, release type) UMFK uses for a movie"""
+    if include_inCinemas:
+        # Check all three dates and use the earliest one
+        dates_to_check = [
+            (movie.get('digitalRelease'), 'Digital'),
+            (movie.get('physicalRelease'), 'Physical'),
+            (movie.get('inCinemas'), 'Cinema')
+        ]
+        
+        valid_dates = [(date_str, rel_type) for date_str, rel_type in dates_to_check if date_str]
+        
+        if valid_dates:
+            # Sort by date and pick the earliest
+            valid_dates.sort(key=lambda x: x[0])
+            return valid_dates[0]
+    else:
+        # Only check digital and physical releases
+        if movie.get('digitalRelease'):
+            return movie['digitalRelease'], 'Digital'
+        elif movie.get('physicalRelease'):
+            return movie['physicalRelease'], 'Physical'
+    
+    return None, None
+
+def find_next_transition(all_movies, future_days_upcoming_movies, utc_offset=0, include_inCinemas=False, now=None):
+    """Find the earliest moment (UTC) at which the classification would change
+
+    A movie changes category when its release date passes (future -> released) or
+    when its release date enters the future_days_upcoming_movies window. Returns None
+    if no monitored, missing movie has such a moment ahead.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    offset = timedelta(hours=utc_offset)
+    window = timedelta(days=future_days_upcoming_movies)
+    next_transition = None
+    
+    for movie in all_movies:
+        if not movie.get('monitored', False) or movie.get('hasFile', False):
+            continue
+        
+        release_date_str, _ = get_release_date(movie, include_inCinemas)
+        if not release_date_str:
+            continue
+        
+        # Release dates are compared in "local" time (see classify_movies): a movie is
+        # released once now + offset reaches the local date, and enters the window once
+        # now + window reaches it.
+        release_date = convert_utc_to_local(release_date_str, utc_offset)
+        for moment in (release_date - offset, release_date - window):
+            if moment > now and (next_transition is None or moment < next_transition):
+                next_transition = moment
+    
+    return next_transition
+
+def classify_movies(all_movies, future_days_upcoming_movies, utc_offset=0, future_only=False, include_inCinemas=False, debug=False, now=None):
+    """Split a list of Radarr movies into future and released movies"""
     future_movies = []
     released_movies = []
     
-    cutoff_date = datetime.now(timezone.utc) + timedelta(days=future_days_upcoming_movies)
-    now_local = datetime.now(timezone.utc) + timedelta(hours=utc_offset)
+    if now is None:
+        now = datetime.now(timezone.utc)
+    cutoff_date = now + timedelta(days=future_days_upcoming_movies)
+    now_local = now + timedelta(hours=utc_offset)
     
     if debug:
         print(f"{BLUE}[DEBUG] Cutoff date: {cutoff_date}, Now local: {now_local}{RESET}")
         print(f"{BLUE}[DEBUG] Future only mode: {future_only}{RESET}")
         print(f"{BLUE}[DEBUG] Include inCinemas: {include_inCinemas}{RESET}")
-    
-    all_movies = get_radarr_movies(radarr_url, api_key)
-    
-    if debug:
         print(f"{BLUE}[DEBUG] Found {len(all_movies)} total movies in Radarr{RESET}")
     
     for movie in all_movies:
@@ -188,31 +459,7 @@ def find_upcoming_movies(radarr_url, api_key, future_days_upcoming_movies, utc_o
             continue
         
         # Get release date based on include_inCinemas setting
-        release_date_str = None
-        release_type = None
-        
-        if include_inCinemas:
-            # Check all three dates and use the earliest one
-            dates_to_check = [
-                (movie.get('digitalRelease'), 'Digital'),
-                (movie.get('physicalRelease'), 'Physical'),
-                (movie.get('inCinemas'), 'Cinema')
-            ]
-            
-            valid_dates = [(date_str, rel_type) for date_str, rel_type in dates_to_check if date_str]
-            
-            if valid_dates:
-                # Sort by date and pick the earliest
-                valid_dates.sort(key=lambda x: x[0])
-                release_date_str, release_type = valid_dates[0]
-        else:
-            # Only check digital and physical releases
-            if movie.get('digitalRelease'):
-                release_date_str = movie['digitalRelease']
-                release_type = 'Digital'
-            elif movie.get('physicalRelease'):
-                release_date_str = movie['physicalRelease']
-                release_type = 'Physical'
+        release_date_str, release_type = get_release_date(movie, include_inCinemas)
         
         if not release_date_str:
             if debug:
@@ -226,6 +473,7 @@ def find_upcoming_movies(radarr_url, api_key, future_days_upcoming_movies, utc_o
             print(f"{BLUE}[DEBUG] {movie['title']} release date: {release_date} ({release_type}){RESET}")
         
         movie_dict = {
+            'id': movie.get('id'),
             'title': movie['title'],
             'tmdbId': movie.get('tmdbId'),
             'imdbId': movie.get('imdbId'),
@@ -250,30 +498,130 @@ def find_upcoming_movies(radarr_url, api_key, future_days_upcoming_movies, utc_o
     
     return future_movies, released_movies
 
-def create_placeholder_video(movie, config, debug=False):
-    """Create a copy of UMFK video in the Coming Soon folder"""
-    # Get the source video file
-    video_folder = Path(__file__).parent / 'video'
-    source_files = list(video_folder.glob('UMFK.*'))
-    
-    if not source_files:
-        print(f"{RED}No UMFK video file found in video folder{RESET}")
-        return False
-    
-    source_file = source_files[0]
+def file_fingerprint(path):
+    """Cheap fingerprint of a file: its size and a hash of its first and last 64 KB"""
+    path = Path(path)
+    size = path.stat().st_size
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_CHUNK))
+        if size > FINGERPRINT_CHUNK:
+            f.seek(max(FINGERPRINT_CHUNK, size - FINGERPRINT_CHUNK))
+            digest.update(f.read(FINGERPRINT_CHUNK))
+    return f"{size}:{digest.hexdigest()}"
+
+@lru_cache(maxsize=None)
+def _source_fingerprint(path, size, mtime_ns):
+    return file_fingerprint(path)
+
+def source_fingerprint(path):
+    """Fingerprint of the source video, computed once as long as the file doesn't change"""
+    stat = Path(path).stat()
+    return _source_fingerprint(str(path), stat.st_size, stat.st_mtime_ns)
+
+class PlaceholderJournal:
+    """Append-only record of placeholders that were completely written
+
+    Each line holds a placeholder path, the fingerprint of the source video it was
+    copied from and the size/mtime it had afterwards. An interrupted run can then
+    skip placeholders that were already completed without reading them again.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        self._lines = 0
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.entries[entry['dest']] = entry
+                        self._lines += 1
+                    except (ValueError, KeyError):
+                        # A line cut off by a crash, ignore it
+                        continue
+
+    def is_complete(self, dest_file, fingerprint):
+        """Check if dest_file was completed from a source with this fingerprint and is unchanged"""
+        entry = self.entries.get(str(dest_file))
+        if not entry or entry['source'] != fingerprint:
+            return False
+        try:
+            stat = Path(dest_file).stat()
+        except OSError:
+            with self._lock:
+                self.entries.pop(str(dest_file), None)
+            return False
+        return stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']
+
+    def record(self, dest_file, fingerprint):
+        """Record a completed placeholder, flushed to disk straight away"""
+        stat = Path(dest_file).stat()
+        entry = {'dest': str(dest_file), 'source': fingerprint, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        with self._lock:
+            self.entries[entry['dest']] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._lines += 1
+
+    def compact(self):
+        """Rewrite the journal without superseded lines or entries of removed placeholders"""
+        with self._lock:
+            # Placeholders removed by cleanup or the watcher since they were recorded
+            for dest in [dest for dest in self.entries if not os.path.exists(dest)]:
+                del self.entries[dest]
+            if self._lines == len(self.entries):
+                return
+            temp_path = self.path.with_name(self.path.name + PARTIAL_SUFFIX)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry) + "\n")
+            os.replace(temp_path, self.path)
+            self._lines = len(self.entries)
+
+def copy_atomic(source_file, dest_file):
+    """Copy source_file to dest_file via a temporary file, so dest_file is never left incomplete"""
+    temp_file = dest_file.with_name(dest_file.name + PARTIAL_SUFFIX)
+    try:
+        shutil.copy2(source_file, temp_file)
+        with open(temp_file, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(temp_file, dest_file)
+    finally:
+        if temp_file.exists():
+            temp_file.unlink()
+
+def find_source_video(video_folder=None):
+    """Get the UMFK video file in the video folder, or None if there is none"""
+    if video_folder is None:
+        video_folder = SCRIPT_DIR / 'video'
+    source_files = sorted(Path(video_folder).glob('UMFK.*'))
+    return source_files[0] if source_files else None
+
+def plan_placeholder_video(movie, config, source_file, journal=None, debug=False):
+    """Decide what has to happen to the placeholder of a movie, without touching the filesystem
+
+    Returns an operation dict whose action is 'create', 'repair', 'keep' or 'error'.
+    """
+    movie_title = movie.get('title', 'Unknown')
+    if source_file is None:
+        return {'action': 'error', 'title': movie_title, 'error': "No UMFK video file found in video folder"}
     video_extension = source_file.suffix
     
     movie_path = movie.get('path')
     if not movie_path:
-        print(f"{RED}No path found for movie: {movie.get('title')}{RESET}")
-        return False
+        return {'action': 'error', 'title': movie_title, 'error': f"No path found for movie: {movie_title}"}
     
     # Apply path mapping
     path_mappings = config.get('path_mapping', {})
     mapped_path = map_path(movie_path, path_mappings)
     
     # Create proper folder and file names
-    movie_title = movie.get('title', 'Unknown')
     movie_year = movie.get('year', '')
     tmdb_id = movie.get('tmdbId', '')
     
@@ -283,7 +631,7 @@ def create_placeholder_video(movie, config, debug=False):
     # File name: "Movie title (yyyy) {tmdb-xxx} {edition-Coming Soon}" - sanitized for Windows  
     file_name = sanitize_filename(f"{movie_title} ({movie_year}) {{tmdb-{tmdb_id}}} {{edition-Coming Soon}}")
     
-    # Create the Coming Soon folder
+    # The Coming Soon folder
     base_path = Path(mapped_path)
     parent_dir = base_path.parent
     coming_soon_path = parent_dir / folder_name
@@ -295,156 +643,185 @@ def create_placeholder_video(movie, config, debug=False):
         print(f"{BLUE}[DEBUG] Folder name: {folder_name}{RESET}")
         print(f"{BLUE}[DEBUG] File name: {file_name}{RESET}")
     
-    # Check if Coming Soon folder already exists
-    if coming_soon_path.exists():
-        if debug:
-            print(f"{ORANGE}[DEBUG] Coming Soon folder already exists for {movie['title']}{RESET}")
+    dest_file = coming_soon_path / f"{file_name}{video_extension}"
+    operation = {'action': 'create', 'title': movie_title, 'folder': coming_soon_path, 'dest': dest_file,
+                 'source': source_file, 'leftovers': []}
+    
+    try:
+        fingerprint = source_fingerprint(source_file)
+        operation['fingerprint'] = fingerprint
+        
+        # Check if a complete placeholder already exists
+        if coming_soon_path.exists():
+            if journal and journal.is_complete(dest_file, fingerprint):
+                operation.update(action='keep', record=False)
+            elif dest_file.exists() and file_fingerprint(dest_file) == fingerprint:
+                operation.update(action='keep', record=journal is not None)
+            else:
+                # Left behind by an interrupted run or an older video: remove leftovers and copy again
+                operation['action'] = 'repair'
+                operation['leftovers'] = [leftover for leftover in coming_soon_path.iterdir()
+                                          if leftover.is_file() and leftover.name.startswith(file_name) and leftover != dest_file]
+    except Exception as e:
+        return {'action': 'error', 'title': movie_title, 'error': f"Error checking placeholder for {movie_title}: {e}"}
+    
+    if debug and operation['action'] == 'keep':
+        print(f"{ORANGE}[DEBUG] Coming Soon folder already exists for {movie_title}{RESET}")
+    return operation
+
+def apply_placeholder_operation(operation, journal=None):
+    """Carry out an operation from plan_placeholder_video, returns True on success"""
+    action = operation['action']
+    if action == 'error':
+        print(f"{RED}{operation['error']}{RESET}")
+        return False
+    
+    dest_file = operation['dest']
+    if action == 'keep':
+        if operation.get('record') and journal:
+            try:
+                journal.record(dest_file, operation['fingerprint'])
+            except OSError as e:
+                print(f"{RED}Error recording placeholder for {operation['title']} in the journal: {e}{RESET}")
+                return False
         return True
     
     try:
+        for leftover in operation['leftovers']:
+            leftover.unlink()
+        
         # Create the folder
-        coming_soon_path.mkdir(parents=True, exist_ok=True)
+        operation['folder'].mkdir(parents=True, exist_ok=True)
         
         # Copy the video file with the proper name
-        dest_file = coming_soon_path / f"{file_name}{video_extension}"
-        shutil.copy2(source_file, dest_file)
+        copy_atomic(operation['source'], dest_file)
+        if journal:
+            journal.record(dest_file, operation['fingerprint'])
         
         size_mb = dest_file.stat().st_size / (1024 * 1024)
-        print(f"{GREEN}Created placeholder for {movie['title']}: {dest_file.name} ({size_mb:.1f} MB){RESET}")
+        verb = "Repaired" if action == 'repair' else "Created"
+        print(f"{GREEN}{verb} placeholder for {operation['title']}: {dest_file.name} ({size_mb:.1f} MB){RESET}")
         return True
         
     except Exception as e:
-        print(f"{RED}Error creating placeholder for {movie['title']}: {e}{RESET}")
+        print(f"{RED}Error creating placeholder for {operation['title']}: {e}{RESET}")
         return False
 
-def cleanup_placeholder_videos(radarr_url, api_key, config, future_movies, released_movies, debug=False):
+def plan_placeholder_cleanup(config, future_movies, released_movies, all_movies, debug=False, keep_paths=None, only_paths=None):
+    """Find the Coming Soon folders that are no longer needed, without removing them
+
+    keep_paths holds extra Coming Soon folders that are still wanted (e.g. by other profiles).
+    only_paths limits the check to these Coming Soon folders instead of scanning the library.
+    Returns a list of 'remove' operations and the number of Coming Soon folders checked.
+    """
     if debug:
         print(f"{BLUE}[DEBUG] Starting placeholder cleanup process{RESET}")
     
-    removed_count = 0
-    checked_count = 0
+    removals = []
     path_mappings = config.get('path_mapping', {})
     
-    # Get all movies from Radarr
-    all_movies = get_radarr_movies(radarr_url, api_key)
-    
     # Create a set of paths that should have Coming Soon folders
-    valid_coming_soon_paths = set()
+    valid_coming_soon_paths = set(str(path) for path in keep_paths or ())
     for movie in future_movies + released_movies:
-        if movie.get('path'):
-            mapped_path = map_path(movie['path'], path_mappings)
-            base_path = Path(mapped_path)
-            parent_dir = base_path.parent
-            
-            # Use new naming convention with sanitization
-            movie_title = movie.get('title', 'Unknown')
-            movie_year = movie.get('year', '')
-            folder_name = sanitize_filename(f"{movie_title} ({movie_year}) {{edition-Coming Soon}}")
-            coming_soon_path = parent_dir / folder_name
+        coming_soon_path = get_coming_soon_path(movie, path_mappings)
+        if coming_soon_path:
             valid_coming_soon_paths.add(str(coming_soon_path))
     
     # Create a dictionary to map Coming Soon folder paths to their corresponding movies (if they exist in Radarr)
     radarr_movie_lookup = {}
-    for movie in all_movies:
-        movie_path = movie.get('path')
-        if not movie_path:
-            continue
-        
-        mapped_path = map_path(movie_path, path_mappings)
-        base_path = Path(mapped_path)
-        parent_dir = base_path.parent
-        
-        # Use new naming convention with sanitization
-        movie_title = movie.get('title', 'Unknown')
-        movie_year = movie.get('year', '')
-        folder_name = sanitize_filename(f"{movie_title} ({movie_year}) {{edition-Coming Soon}}")
-        coming_soon_path = parent_dir / folder_name
-        radarr_movie_lookup[str(coming_soon_path)] = movie
-    
     # Collect all unique parent directories from both current movies and valid paths
     parent_dirs_to_scan = set()
     
-    # Add parent dirs from current Radarr movies
     for movie in all_movies:
-        movie_path = movie.get('path')
-        if movie_path:
-            mapped_path = map_path(movie_path, path_mappings)
-            base_path = Path(mapped_path)
-            parent_dirs_to_scan.add(base_path.parent)
+        coming_soon_path = get_coming_soon_path(movie, path_mappings)
+        if not coming_soon_path:
+            continue
+        radarr_movie_lookup[str(coming_soon_path)] = movie
+        
+        # Add parent dirs from current Radarr movies
+        parent_dirs_to_scan.add(coming_soon_path.parent)
     
     # Add parent dirs from valid coming soon paths
     for valid_path in valid_coming_soon_paths:
         parent_dirs_to_scan.add(Path(valid_path).parent)
     
-    if debug:
-        print(f"{BLUE}[DEBUG] Scanning {len(parent_dirs_to_scan)} parent directories for Coming Soon folders{RESET}")
-    
     # Scan all parent directories for Coming Soon folders
-    for parent_dir in parent_dirs_to_scan:
-        if not parent_dir.exists():
-            continue
+    coming_soon_folders = []
+    if only_paths is not None:
+        coming_soon_folders = [Path(path) for path in only_paths if Path(path).is_dir()]
+    else:
+        if debug:
+            print(f"{BLUE}[DEBUG] Scanning {len(parent_dirs_to_scan)} parent directories for Coming Soon folders{RESET}")
+        for parent_dir in parent_dirs_to_scan:
+            if not parent_dir.exists():
+                continue
             
-        # Look for folders matching the Coming Soon pattern
-        try:
-            for folder in parent_dir.iterdir():
-                if folder.is_dir() and "{edition-Coming Soon}" in folder.name:
-                    checked_count += 1
-                    folder_path_str = str(folder)
-                    
-                    if debug:
-                        print(f"{BLUE}[DEBUG] Found Coming Soon folder: {folder.name}{RESET}")
-                    
-                    should_remove = False
-                    reason = ""
-                    movie_title = "Unknown Movie"
-                    
-                    # Check if this folder corresponds to a movie in Radarr
-                    if folder_path_str in radarr_movie_lookup:
-                        movie = radarr_movie_lookup[folder_path_str]
-                        movie_title = movie.get('title', 'Unknown Movie')
-                        
-                        # Check if movie has been downloaded
-                        if movie.get('hasFile', False):
-                            should_remove = True
-                            reason = "movie has been downloaded"
-                        # Check if folder is no longer in valid list
-                        elif folder_path_str not in valid_coming_soon_paths:
-                            should_remove = True
-                            reason = "movie no longer meets criteria"
-                        elif debug:
-                            print(f"{BLUE}[DEBUG] Keeping placeholder for {movie_title} - still upcoming{RESET}")
-                    else:
-                        # Folder exists but no corresponding movie in Radarr
-                        should_remove = True
-                        reason = "movie no longer exists in Radarr"
-                        # Try to extract movie title from folder name for better logging
-                        try:
-                            # Extract title from "Movie Title (Year) {edition-Coming Soon}" format
-                            folder_name = folder.name
-                            if " {edition-Coming Soon}" in folder_name:
-                                movie_title = folder_name.replace(" {edition-Coming Soon}", "")
-                        except:
-                            movie_title = folder.name
-                    
-                    if should_remove:
-                        try:
-                            # Calculate size before deletion
-                            total_size = sum(f.stat().st_size for f in folder.rglob('*') if f.is_file())
-                            size_mb = total_size / (1024 * 1024)
-                            
-                            # Remove the folder and its contents
-                            shutil.rmtree(folder)
-                            removed_count += 1
-                            print(f"{GREEN}Removed placeholder for {movie_title} - {reason} ({size_mb:.1f} MB freed){RESET}")
-                            if debug:
-                                print(f"{BLUE}[DEBUG] Deleted: {folder}{RESET}")
-                        except Exception as e:
-                            print(f"{RED}Error removing placeholder for {movie_title}: {e}{RESET}")
-        except Exception as e:
-            if debug:
-                print(f"{ORANGE}[DEBUG] Error scanning directory {parent_dir}: {e}{RESET}")
-            continue
+            # Look for folders matching the Coming Soon pattern
+            try:
+                for folder in parent_dir.iterdir():
+                    if folder.is_dir() and "{edition-Coming Soon}" in folder.name:
+                        coming_soon_folders.append(folder)
+            except Exception as e:
+                if debug:
+                    print(f"{ORANGE}[DEBUG] Error scanning directory {parent_dir}: {e}{RESET}")
+                continue
+    
+    for folder in coming_soon_folders:
+        folder_path_str = str(folder)
+        
+        if debug:
+            print(f"{BLUE}[DEBUG] Found Coming Soon folder: {folder.name}{RESET}")
+        
+        should_remove = False
+        reason = ""
+        movie_title = "Unknown Movie"
+        
+        # Check if this folder corresponds to a movie in Radarr
+        if folder_path_str in radarr_movie_lookup:
+            movie = radarr_movie_lookup[folder_path_str]
+            movie_title = movie.get('title', 'Unknown Movie')
+            
+            # Check if movie has been downloaded
+            if movie.get('hasFile', False):
+                should_remove = True
+                reason = "movie has been downloaded"
+            # Check if folder is no longer in valid list
+            elif folder_path_str not in valid_coming_soon_paths:
+                should_remove = True
+                reason = "movie no longer meets criteria"
+            elif debug:
+                print(f"{BLUE}[DEBUG] Keeping placeholder for {movie_title} - still upcoming{RESET}")
+        else:
+            # Folder exists but no corresponding movie in Radarr
+            should_remove = True
+            reason = "movie no longer exists in Radarr"
+            # Extract title from "Movie Title (Year) {edition-Coming Soon}" format for better logging
+            movie_title = folder.name.replace(" {edition-Coming Soon}", "")
+        
+        if should_remove:
+            removals.append({'action': 'remove', 'title': movie_title, 'folder': folder, 'reason': reason})
     
+    return removals, len(coming_soon_folders)
+
+def apply_removal(operation, debug=False):
+    """Remove a Coming Soon folder planned by plan_placeholder_cleanup, returns True on success"""
+    folder = operation['folder']
+    try:
+        # Calculate size before deletion
+        total_size = sum(f.stat().st_size for f in folder.rglob('*') if f.is_file())
+        size_mb = total_size / (1024 * 1024)
+        
+        # Remove the folder and its contents
+        shutil.rmtree(folder)
+        print(f"{GREEN}Removed placeholder for {operation['title']} - {operation['reason']} ({size_mb:.1f} MB freed){RESET}")
+        if debug:
+            print(f"{BLUE}[DEBUG] Deleted: {folder}{RESET}")
+        return True
+    except Exception as e:
+        print(f"{RED}Error removing placeholder for {operation['title']}: {e}{RESET}")
+        return False
+
+def print_cleanup_summary(removed_count, checked_count, debug=False):
     if removed_count > 0:
         print(f"{GREEN}Cleanup complete: Removed {removed_count} placeholder(s) from {checked_count} checked{RESET}")
     elif checked_count > 0:
@@ -452,6 +829,271 @@ def cleanup_placeholder_videos(radarr_url, api_key, config, future_movies, relea
     elif debug:
         print(f"{BLUE}[DEBUG] No Coming Soon folders found to check{RESET}")
 
+def is_movie_file(path):
+    """Check if a file in a movie folder is the movie itself rather than an extra or sample"""
+    if path.suffix.lower() not in VIDEO_EXTENSIONS:
+        return False
+    stem = path.stem.lower()
+    return not (stem.endswith(EXTRAS_SUFFIXES) or stem == 'sample' or stem.endswith('.sample'))
+
+class PlaceholderWatcher:
+    """Remove Coming Soon folders as soon as a video file lands in the real movie folder
+
+    Only the movie folders of placeheld movies are watched with inotify (or their parent
+    folder while the movie folder doesn't exist yet), so no Radarr poll or library scan is needed.
+    placeholders maps each real movie folder to the 'remove' operation for its Coming Soon folder.
+    """
+    MOVIE_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+    PARENT_MASK = IN_CREATE | IN_MOVED_TO | IN_ONLYDIR
+
+    def __init__(self, placeholders, debug=False, dry_run=False):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        
+        self.debug = debug
+        self.dry_run = dry_run
+        self.pending = dict(placeholders)
+        self.removed = 0
+        self.watches = {}
+        # Parent folder -> movie folders in it that don't exist yet
+        self.waiting = defaultdict(set)
+        for movie_folder in list(self.pending):
+            self._watch_movie(movie_folder)
+
+    def close(self):
+        os.close(self.fd)
+
+    def _add_watch(self, folder, mask):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), mask)
+        if wd < 0:
+            return None
+        self.watches[wd] = folder
+        return wd
+
+    def _remove_watch(self, folder):
+        for wd, watched in list(self.watches.items()):
+            if watched == folder:
+                del self.watches[wd]
+                self.libc.inotify_rm_watch(self.fd, wd)
+
+    def _watch_movie(self, movie_folder):
+        """Watch a movie folder, or its parent until the movie folder is created"""
+        if self._add_watch(movie_folder, self.MOVIE_MASK) is not None:
+            # The video may have landed before the watch was in place
+            self._scan(movie_folder)
+        elif self._add_watch(movie_folder.parent, self.PARENT_MASK) is not None:
+            self.waiting[movie_folder.parent].add(movie_folder)
+            if movie_folder.is_dir():
+                # Created in between, so the parent watch missed it
+                self._handle_created_folder(movie_folder.parent, movie_folder)
+        elif self.debug:
+            print(f"{ORANGE}[DEBUG] Can't watch {movie_folder} or its parent folder{RESET}")
+
+    def _handle_created_folder(self, parent, movie_folder):
+        self.waiting[parent].discard(movie_folder)
+        if not self.waiting[parent]:
+            del self.waiting[parent]
+            self._remove_watch(parent)
+        if movie_folder in self.pending:
+            self._watch_movie(movie_folder)
+
+    def _scan(self, movie_folder):
+        try:
+            videos = [f for f in movie_folder.iterdir() if is_movie_file(f) and f.is_file()]
+        except OSError:
+            return
+        if videos:
+            self._found(movie_folder, videos[0])
+
+    def _found(self, movie_folder, video_file):
+        operation = self.pending.pop(movie_folder, None)
+        if operation is None:
+            return
+        self._remove_watch(movie_folder)
+        operation = dict(operation, reason=f"{video_file.name} arrived")
+        if self.dry_run:
+            print(f"{ORANGE}- remove placeholder: {operation['folder']} ({operation['reason']}){RESET}")
+        elif apply_removal(operation, self.debug):
+            self.removed += 1
+
+    def _handle(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # Events were dropped, look at the watched folders again
+            for movie_folder in list(self.pending):
+                if movie_folder in self.watches.values():
+                    self._scan(movie_folder)
+            return
+        folder = self.watches.get(wd)
+        if folder is None:
+            return
+        if mask & IN_IGNORED:
+            # The watched folder was deleted or moved away; wait for it to come back
+            del self.watches[wd]
+            if folder in self.pending:
+                self._watch_movie(folder)
+            return
+        
+        if folder in self.pending:
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self._remove_watch(folder)
+                self._watch_movie(folder)
+                return
+            video_file = folder / name
+            if mask & IN_ISDIR or not is_movie_file(video_file):
+                return
+            # A copy is complete on close; a hardlink or move arrives complete at once
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self._found(folder, video_file)
+            elif mask & IN_CREATE:
+                try:
+                    if video_file.stat().st_nlink > 1:
+                        self._found(folder, video_file)
+                except OSError:
+                    pass
+        
+        movie_folder = folder / name
+        if mask & IN_ISDIR and movie_folder in self.waiting.get(folder, ()):
+            self._handle_created_folder(folder, movie_folder)
+
+    def wait(self, timeout):
+        """Handle events for timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not self.pending:
+                time.sleep(remaining)
+                return
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                continue
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset:offset + name_length].rstrip(b'\0'))
+                offset += name_length
+                self._handle(wd, mask, name)
+
+def watch_placeholders(pipelines, timeout, dry_run=False):
+    """Watch the placeheld movies for timeout seconds, removing placeholders as their movie arrives"""
+    placeholders = {}
+    for pipeline in pipelines:
+        # Profiles with cleanup disabled keep their placeholders
+        if pipeline.settings['cleanup']:
+            placeholders.update(pipeline.placeholder_removals())
+    debug = any(pipeline.settings['debug'] for pipeline in pipelines)
+    print(f"{BLUE}Watching {len(placeholders)} movie folder(s) for downloads{RESET}")
+    try:
+        watcher = PlaceholderWatcher(placeholders, debug, dry_run)
+    except OSError as e:
+        print(f"{ORANGE}Can't watch movie folders ({e}), placeholders are cleaned up on the next run{RESET}")
+        time.sleep(timeout)
+        return 0
+    
+    try:
+        watcher.wait(timeout)
+    finally:
+        watcher.close()
+    return watcher.removed
+
+def plan_file_write(output_file, content):
+    """A 'write' operation for output_file, or None if it already has this content"""
+    output_file = Path(output_file)
+    try:
+        if output_file.read_text(encoding="utf-8") == content:
+            return None
+    except OSError:
+        pass
+    return {'action': 'write', 'title': output_file.name, 'folder': output_file.parent, 'path': output_file, 'content': content}
+
+def apply_file_write(operation):
+    """Write a file planned by plan_file_write, returns True on success"""
+    try:
+        operation['folder'].mkdir(parents=True, exist_ok=True)
+        with open(operation['path'], "w", encoding="utf-8") as f:
+            f.write(operation['content'])
+        return True
+    except OSError as e:
+        print(f"{RED}Error writing {operation['path']}: {e}{RESET}")
+        return False
+
+def mount_id(path):
+    """Device id of the filesystem a (possibly not yet existing) path lives on"""
+    path = Path(path)
+    for candidate in (path, *path.parents):
+        try:
+            return os.stat(candidate).st_dev
+        except OSError:
+            continue
+    return None
+
+@dataclass
+class Plan:
+    """Everything a run wants to change on disk
+
+    create holds 'create'/'repair' operations, keep holds placeholders that are already
+    complete, remove holds Coming Soon folders to delete and write holds .yml files whose
+    content changed. checked is None when cleanup wasn't planned.
+    """
+    create: list = field(default_factory=list)
+    keep: list = field(default_factory=list)
+    remove: list = field(default_factory=list)
+    write: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    checked: int = None
+
+    @property
+    def is_noop(self):
+        return not (self.create or self.remove or self.write)
+
+    def batches(self, operations=None):
+        """Group the changes (or only these operations) by mount and parent folder
+
+        Returns {mount id: [(parent folder, operations), ...]}. Within a folder, removals
+        come before creations and writes.
+        """
+        if operations is None:
+            operations = self.remove + self.create + self.write
+        by_folder = defaultdict(list)
+        for operation in operations:
+            # Placeholders live next to the movie folders, .yml files directly in their folder
+            parent_dir = operation['folder'] if operation['action'] == 'write' else operation['folder'].parent
+            by_folder[parent_dir].append(operation)
+        
+        batches = defaultdict(list)
+        for parent_dir in sorted(by_folder, key=str):
+            batches[mount_id(parent_dir)].append((parent_dir, by_folder[parent_dir]))
+        return batches
+
+def print_plan(plan, name=None):
+    """Print a plan, e.g. for --dry-run"""
+    header = f"Plan for {name}" if name else "Plan"
+    print(f"\n{BOLD}{BLUE}{header}:{RESET}")
+    if plan.is_noop and not plan.errors:
+        print(f"{GREEN}Nothing to change ({len(plan.keep)} placeholder(s) up to date){RESET}")
+        return
+    for operation in plan.create:
+        print(f"{GREEN}+ {operation['action']} placeholder: {operation['dest']}{RESET}")
+    for operation in plan.remove:
+        print(f"{ORANGE}- remove {operation['folder']} ({operation['reason']}){RESET}")
+    for operation in plan.write:
+        print(f"{BLUE}~ write {operation['path']}{RESET}")
+    for operation in plan.errors:
+        print(f"{RED}! {operation['error']}{RESET}")
+    print(f"{len(plan.keep)} placeholder(s) up to date")
+
 def format_date(yyyy_mm_dd, date_format, capitalize=False):
     """Format date according to specified format"""
     dt_obj = datetime.strptime(yyyy_mm_dd, "%Y-%m-%d")
@@ -497,14 +1139,12 @@ def format_date(yyyy_mm_dd, date_format, capitalize=False):
         print(f"{RED}Error: Invalid date format '{date_format}'. Using default format.{RESET}")
         return yyyy_mm_dd  # Return original format as fallback
 
-def create_overlay_yaml(output_file, future_movies, released_movies, config_sections):
-    """Create overlay YAML file with movies grouped by release status and date"""
+def build_overlay_yaml(future_movies, released_movies, config_sections):
+    """Build the content of the overlay YAML file"""
     import yaml
 
     if not future_movies and not released_movies:
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write("#No matching movies found")
-        return
+        return "#No matching movies found"
     
     overlays_dict = {}
     
@@ -619,11 +1259,10 @@ def create_overlay_yaml(output_file, future_movies, released_movies, config_sect
     
     final_output = {"overlays": overlays_dict}
     
-    with open(output_file, "w", encoding="utf-8") as f:
-        yaml.dump(final_output, f, sort_keys=False)
+    return yaml.dump(final_output, sort_keys=False)
 
-def create_collection_yaml(output_file, future_movies, released_movies, config):
-    """Create collection YAML file"""
+def build_collection_yaml(future_movies, released_movies, config):
+    """Build the content of the collection YAML file"""
     import yaml
     from yaml.representer import SafeRepresenter
     from collections import OrderedDict
@@ -683,9 +1322,7 @@ def create_collection_yaml(output_file, future_movies, released_movies, config):
             }
         }
         
-        with open(output_file, "w", encoding="utf-8") as f:
-            yaml.dump(data, f, Dumper=yaml.SafeDumper, sort_keys=False)
-        return
+        return yaml.dump(data, Dumper=yaml.SafeDumper, sort_keys=False)
     
     tmdb_ids = [m['tmdbId'] for m in all_movies if m.get('tmdbId')]
     if not tmdb_ids:
@@ -709,9 +1346,7 @@ def create_collection_yaml(output_file, future_movies, released_movies, config):
             }
         }
         
-        with open(output_file, "w", encoding="utf-8") as f:
-            yaml.dump(data, f, Dumper=yaml.SafeDumper, sort_keys=False)
-        return
+        return yaml.dump(data, Dumper=yaml.SafeDumper, sort_keys=False)
 
     # Convert to comma-separated
     tmdb_ids_str = ", ".join(str(i) for i in sorted(tmdb_ids))
@@ -755,137 +1390,1038 @@ def create_collection_yaml(output_file, future_movies, released_movies, config):
         }
     }
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        yaml.dump(data, f, Dumper=yaml.SafeDumper, sort_keys=False)
+    return yaml.dump(data, Dumper=yaml.SafeDumper, sort_keys=False)
+
+class _BitWriter:
+    """Writes the bit fields of an H.264 NAL unit"""
+
+    def __init__(self):
+        self.bits = []
+
+    def u(self, bit_count, value):
+        self.bits.extend((value >> shift) & 1 for shift in range(bit_count - 1, -1, -1))
+
+    def ue(self, value):
+        # Exp-Golomb code
+        value += 1
+        self.u(value.bit_length() - 1, 0)
+        self.u(value.bit_length(), value)
+
+    def se(self, value):
+        self.ue(2 * value - 1 if value > 0 else -2 * value)
+
+    def nal(self, header):
+        """Close the RBSP and return the NAL unit with emulation prevention bytes"""
+        self.bits.append(1)
+        self.bits.extend([0] * (-len(self.bits) % 8))
+        rbsp = bytes(int(''.join(map(str, self.bits[i:i + 8])), 2) for i in range(0, len(self.bits), 8))
+        
+        payload = bytearray()
+        zeros = 0
+        for byte in rbsp:
+            if zeros >= 2 and byte <= 3:
+                payload.append(3)
+                zeros = 0
+            payload.append(byte)
+            zeros = zeros + 1 if byte == 0 else 0
+        return bytes([header]) + bytes(payload)
+
+def _h264_stream(width, height, frame_count):
+    """Encode a uniform grey H.264 (Baseline) stream: one IDR frame followed by skipped P frames
 
-def check_video_file():
-    """Check if UMFK video file exists"""
-    video_folder = Path(__file__).parent / 'video'
+    Returns the SPS, the PPS and one NAL unit per frame.
+    """
+    width_mbs, height_mbs = -(-width // 16), -(-height // 16)
+    mb_count = width_mbs * height_mbs
+    crop_right, crop_bottom = (width_mbs * 16 - width) // 2, (height_mbs * 16 - height) // 2
+    level = 40 if mb_count <= 8192 else 51
+    
+    sps = _BitWriter()
+    sps.u(8, 66)                        # profile_idc: Baseline
+    sps.u(8, 0xC0)                      # constraint_set0/1 flags
+    sps.u(8, level)
+    sps.ue(0)                           # seq_parameter_set_id
+    sps.ue(0)                           # log2_max_frame_num_minus4
+    sps.ue(2)                           # pic_order_cnt_type: output order = decoding order
+    sps.ue(1)                           # max_num_ref_frames
+    sps.u(1, 0)                         # gaps_in_frame_num_value_allowed_flag
+    sps.ue(width_mbs - 1)
+    sps.ue(height_mbs - 1)
+    sps.u(1, 1)                         # frame_mbs_only_flag
+    sps.u(1, 1)                         # direct_8x8_inference_flag
+    if crop_right or crop_bottom:
+        sps.u(1, 1)
+        for offset in (0, crop_right, 0, crop_bottom):
+            sps.ue(offset)
+    else:
+        sps.u(1, 0)
+    sps.u(1, 0)                         # vui_parameters_present_flag
+    
+    pps = _BitWriter()
+    pps.ue(0)                           # pic_parameter_set_id
+    pps.ue(0)                           # seq_parameter_set_id
+    pps.u(1, 0)                         # entropy_coding_mode_flag: CAVLC
+    pps.u(1, 0)                         # bottom_field_pic_order_in_frame_present_flag
+    pps.ue(0)                           # num_slice_groups_minus1
+    pps.ue(0)                           # num_ref_idx_l0_default_active_minus1
+    pps.ue(0)                           # num_ref_idx_l1_default_active_minus1
+    pps.u(1, 0)                         # weighted_pred_flag
+    pps.u(2, 0)                         # weighted_bipred_idc
+    pps.se(0)                           # pic_init_qp_minus26
+    pps.se(0)                           # pic_init_qs_minus26
+    pps.se(0)                           # chroma_qp_index_offset
+    pps.u(1, 0)                         # deblocking_filter_control_present_flag
+    pps.u(1, 0)                         # constrained_intra_pred_flag
+    pps.u(1, 0)                         # redundant_pic_cnt_present_flag
+    
+    idr = _BitWriter()
+    idr.ue(0)                           # first_mb_in_slice
+    idr.ue(7)                           # slice_type: I
+    idr.ue(0)                           # pic_parameter_set_id
+    idr.u(4, 0)                         # frame_num
+    idr.ue(0)                           # idr_pic_id
+    idr.u(1, 0)                         # no_output_of_prior_pics_flag
+    idr.u(1, 0)                         # long_term_reference_flag
+    idr.se(0)                           # slice_qp_delta
+    for _ in range(mb_count):
+        # I_16x16 with DC prediction and no residual: without neighbours every pixel is 128
+        idr.ue(3)                       # mb_type: I_16x16_2_0_0
+        idr.ue(0)                       # intra_chroma_pred_mode: DC
+        idr.se(0)                       # mb_qp_delta
+        idr.u(1, 1)                     # coeff_token of the luma DC block: no coefficients
+    frames = [idr.nal(0x65)]
+    
+    for frame_num in range(1, frame_count):
+        p_slice = _BitWriter()
+        p_slice.ue(0)                   # first_mb_in_slice
+        p_slice.ue(5)                   # slice_type: P
+        p_slice.ue(0)                   # pic_parameter_set_id
+        p_slice.u(4, frame_num % 16)    # frame_num
+        p_slice.u(1, 0)                 # num_ref_idx_active_override_flag
+        p_slice.u(1, 0)                 # ref_pic_list_modification_flag_l0
+        p_slice.u(1, 0)                 # adaptive_ref_pic_marking_mode_flag
+        p_slice.se(0)                   # slice_qp_delta
+        p_slice.ue(mb_count)            # mb_skip_run: every macroblock is copied from the previous frame
+        frames.append(p_slice.nal(0x61))
+    
+    return sps.nal(0x67), pps.nal(0x68), frames
+
+def _box(box_type, *payloads):
+    payload = b''.join(payloads)
+    return struct.pack('>I', 8 + len(payload)) + box_type + payload
+
+def _full_box(box_type, version, flags, *payloads):
+    return _box(box_type, struct.pack('>I', (version << 24) | flags), *payloads)
+
+def generate_placeholder_mp4(width=1280, height=720, duration=10):
+    """Build a minimal valid MP4: a grey H.264 video of `duration` seconds at 1 frame per second"""
+    timescale = 1000
+    frame_count = max(1, int(duration))
+    sps, pps, frames = _h264_stream(width, height, frame_count)
+    samples = [struct.pack('>I', len(frame)) + frame for frame in frames]
+    media_duration = frame_count * timescale
+    matrix = struct.pack('>9I', 0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000)
+    
+    avcc = _box(b'avcC', bytes([1, sps[1], sps[2], sps[3], 0xFF, 0xE1]), struct.pack('>H', len(sps)), sps,
+                bytes([1]), struct.pack('>H', len(pps)), pps)
+    avc1 = _box(b'avc1', bytes(6), struct.pack('>H', 1), bytes(16), struct.pack('>HH', width, height),
+                struct.pack('>II', 0x00480000, 0x00480000), bytes(4), struct.pack('>H', 1), bytes(32),
+                struct.pack('>Hh', 0x0018, -1), avcc)
+    
+    def moov(chunk_offset):
+        stbl = _box(b'stbl',
+                    _full_box(b'stsd', 0, 0, struct.pack('>I', 1), avc1),
+                    _full_box(b'stts', 0, 0, struct.pack('>III', 1, frame_count, timescale)),
+                    _full_box(b'stss', 0, 0, struct.pack('>II', 1, 1)),
+                    _full_box(b'stsc', 0, 0, struct.pack('>IIII', 1, 1, frame_count, 1)),
+                    _full_box(b'stsz', 0, 0, struct.pack('>II', 0, frame_count),
+                              b''.join(struct.pack('>I', len(sample)) for sample in samples)),
+                    _full_box(b'stco', 0, 0, struct.pack('>II', 1, chunk_offset)))
+        minf = _box(b'minf',
+                    _full_box(b'vmhd', 0, 1, bytes(8)),
+                    _box(b'dinf', _full_box(b'dref', 0, 0, struct.pack('>I', 1), _full_box(b'url ', 0, 1))),
+                    stbl)
+        mdia = _box(b'mdia',
+                    _full_box(b'mdhd', 0, 0, struct.pack('>IIIIHH', 0, 0, timescale, media_duration, 0x55C4, 0)),
+                    _full_box(b'hdlr', 0, 0, bytes(4), b'vide', bytes(12), b'VideoHandler\0'),
+                    minf)
+        tkhd = _full_box(b'tkhd', 0, 3, struct.pack('>IIIII', 0, 0, 1, 0, media_duration), bytes(8),
+                         struct.pack('>hhhH', 0, 0, 0, 0), matrix, struct.pack('>II', width << 16, height << 16))
+        mvhd = _full_box(b'mvhd', 0, 0, struct.pack('>IIIIIH', 0, 0, timescale, media_duration, 0x00010000, 0x0100),
+                         bytes(10), matrix, bytes(24), struct.pack('>I', 2))
+        return _box(b'moov', mvhd, _box(b'trak', tkhd, mdia))
+    
+    ftyp = _box(b'ftyp', b'isom', struct.pack('>I', 0x200), b'isomiso2avc1mp41')
+    # moov goes first so players can start without reading the whole file; its size doesn't depend on the offset
+    chunk_offset = len(ftyp) + len(moov(0)) + 8
+    return ftyp + moov(chunk_offset) + _box(b'mdat', *samples)
+
+def check_video_file(video_folder=None):
+    """Check if UMFK video file exists, returns its path or None"""
+    if video_folder is None:
+        video_folder = SCRIPT_DIR / 'video'
     if not video_folder.exists():
         print(f"{RED}Video folder not found. Please create a 'video' folder in the script directory.{RESET}")
-        return False
+        return None
     
-    source_files = list(video_folder.glob('UMFK.*'))
-    if not source_files:
+    source_file = find_source_video(video_folder)
+    if source_file is None:
         print(f"{RED}UMFK video file not found in video folder. Please add a video file named 'UMFK' (with any extension).{RESET}")
-        return False
+        return None
     
-    source_file = source_files[0]
     size_mb = source_file.stat().st_size / (1024 * 1024)
     print(f"{GREEN}Found video file: {source_file.name} ({size_mb:.1f} MB){RESET}")
-    return True
+    return source_file
 
-def main():
-    start_time = datetime.now()
-    print(f"{BLUE}{'*' * 44}\n{'*' * 5} Upcoming Movies for Kometa {VERSION} {'*' * 5}\n{'*' * 44}{RESET}")
-    check_for_updates()
-    
-    # Check if video file exists
-    if not check_video_file():
-        sys.exit(1)
-    
-    config = load_config()
-    
-    try:
-        # Process and validate Radarr URL
-        radarr_url = process_radarr_url(config['radarr_url'], config['radarr_api_key'])
-        radarr_api_key = config['radarr_api_key']
-        
-        # Get configuration values
-        future_days_upcoming_movies = config.get('future_days_upcoming_movies', 30)
-        utc_offset = float(config.get('utc_offset', 0))
-        future_only = str(config.get("future_only", "false")).lower() == "true"
-        include_inCinemas = str(config.get("include_inCinemas", "false")).lower() == "true"
-        cleanup = str(config.get("cleanup", "true")).lower() == "true"
-        debug = str(config.get("debug", "false")).lower() == "true"
-        
-        print(f"future_days_upcoming_movies: {future_days_upcoming_movies}")
-        print(f"UTC offset: {utc_offset} hours")
-        print(f"future_only: {future_only}")
-        print(f"include_inCinemas: {include_inCinemas}")
-        print(f"cleanup: {cleanup}")
-        print(f"debug: {debug}\n")
+@dataclass
+class PipelineResult:
+    """Structured result of a UMFK run"""
+    future_movies: list = field(default_factory=list)
+    released_movies: list = field(default_factory=list)
+    placeholders: dict = field(default_factory=dict)
+    cleanup: dict = None
+    overlay_file: Path = None
+    collection_file: Path = None
+    report_file: Path = None
+    stages: dict = field(default_factory=dict)
+    plan: 'Plan' = None
+    next_transition: datetime = None
+    runtime: timedelta = None
+
+class UMFKPipeline:
+    """Run UMFK in-process, one stage at a time or all at once via run()
+
+    Stages raise UMFKError subclasses instead of exiting, so the pipeline can be
+    driven from another Python program.
+    """
+
+    def __init__(self, config, base_dir=None, pipelined=None, name=None):
+        self.config = config or {}
+        self.name = name or self.config.get('profile_name', 'default')
+        self.base_dir = Path(base_dir) if base_dir else SCRIPT_DIR
+        self.settings = get_settings(self.config)
+        if pipelined is not None:
+            self.settings['pipelined'] = pipelined
+        self.video_folder = self._resolve_path(self.config.get('video_folder', 'video'))
+        self.kometa_folder = self._resolve_path(self.config.get('kometa_folder', 'Kometa'))
+        self.state_folder = self._resolve_path(self.config.get('state_folder', 'state'))
+        self.radarr_url = None
+        self.all_movies = None
+        # Delta sync: ids of movies changed since the last sync (None after a full sync)
+        # and the snapshot versions of those movies from before the sync
+        self.changed_ids = None
+        self.previous_movies = {}
+        # Movies and Coming Soon folders to process when classification was incremental
+        self.delta_ids = None
+        self.cleanup_paths = None
+        self.keep_paths = set()
+        # With dry_run, nothing is written: not the library, the Kometa folder or the state
+        self.dry_run = False
+        self._placeholder_journal = None
+        self._source_video = None
+        # Delta sync state to store once the run has been applied, and the failures of apply()
+        self._pending_state = {}
+        self.failed_operations = 0
+        self._classified = False
+        self.result = PipelineResult()
+
+    @classmethod
+    def from_file(cls, file_path=None, base_dir=None, pipelined=None):
+        """Create a pipeline from a YAML config file"""
+        name = Path(file_path).stem if file_path else None
+        return cls(load_config(file_path), base_dir, pipelined, name)
+
+    @property
+    def radarr_key(self):
+        """Identifies the Radarr instance, so profiles can share a snapshot"""
+        return (str(self.config.get('radarr_url', '')).rstrip('/'), self.config.get('radarr_api_key'))
+
+    def fresh_copy(self):
+        """A new pipeline with the same config and folders, for another run"""
+        pipeline = UMFKPipeline(self.config, self.base_dir, self.settings['pipelined'], self.name)
+        pipeline.kometa_folder = self.kometa_folder
+        pipeline.dry_run = self.dry_run
+        return pipeline
+
+    def snapshot(self):
+        """The fetched Radarr state, to share with other pipelines"""
+        return self.radarr_url, self.all_movies, self.changed_ids, self.previous_movies
+
+    def use_snapshot(self, radarr_url, all_movies, changed_ids=None, previous_movies=None):
+        """Reuse a Radarr snapshot fetched by another pipeline"""
+        self.radarr_url = radarr_url
+        self.all_movies = all_movies
+        self.changed_ids = changed_ids
+        self.previous_movies = previous_movies or {}
+
+    @contextmanager
+    def _stage(self, name):
+        """Record the duration of a stage, and its memory use while tracemalloc is tracing"""
+        stats = {}
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats['seconds'] = time.perf_counter() - start
+            if tracing:
+                stats['peak_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+                own_file = tracemalloc.Filter(False, tracemalloc.__file__)
+                after = tracemalloc.take_snapshot().filter_traces([own_file])
+                top = after.compare_to(before.filter_traces([own_file]), 'lineno')[:3]
+                stats['top_allocations'] = [str(stat) for stat in top]
+            self.result.stages[name] = stats
+
+    def _resolve_path(self, path):
+        path = Path(path)
+        return path if path.is_absolute() else self.base_dir / path
+
+    def check_video(self):
+        """Make sure the placeholder video file exists"""
+        if get_placeholder_video_settings(self.config)['generate']:
+            source_file = self.resolve_source_video()
+            size_kb = source_file.stat().st_size / 1024
+            print(f"{GREEN}Using generated placeholder video: {source_file.name} ({size_kb:.1f} KB){RESET}")
+            return
         
-        # ---- Find Upcoming Movies ----
-        print(f"{BLUE}Finding upcoming movies...{RESET}")
-        future_movies, released_movies = find_upcoming_movies(
-            radarr_url, radarr_api_key, future_days_upcoming_movies, utc_offset, future_only, include_inCinemas, debug
-        )
+        # The file checked here is the one resolve_source_video() returns for the rest of the run
+        source_file = check_video_file(self.video_folder)
+        if source_file is None:
+            raise VideoFileError(f"UMFK video file not found in {self.video_folder}")
+        self._source_video = source_file
+
+    def resolve_source_video(self):
+        """The video copied into every placeholder, resolved once per run
+
+        With placeholder_video generate enabled, a minimal MP4 is generated and cached in the
+        state folder (or the temp folder during a dry run); otherwise it's the UMFK video file.
+        """
+        if self._source_video is not None:
+            return self._source_video
+        
+        video_settings = get_placeholder_video_settings(self.config)
+        if not video_settings['generate']:
+            self._source_video = find_source_video(self.video_folder)
+            return self._source_video
+        
+        cache_folder = Path(tempfile.gettempdir()) if self.dry_run else self.state_folder
+        source_file = cache_folder / "UMFK_generated_{width}x{height}_{duration}s.mp4".format(**video_settings)
+        if not source_file.exists():
+            cache_folder.mkdir(parents=True, exist_ok=True)
+            temp_file = source_file.with_name(source_file.name + PARTIAL_SUFFIX)
+            temp_file.write_bytes(generate_placeholder_mp4(video_settings['width'], video_settings['height'],
+                                                           video_settings['duration']))
+            os.replace(temp_file, source_file)
+        self._source_video = source_file
+        return source_file
+
+    def connect(self):
+        """Locate the Radarr API"""
+        if 'radarr_url' not in self.config or 'radarr_api_key' not in self.config:
+            raise ConfigError("Config is missing 'radarr_url' or 'radarr_api_key'")
+        self.radarr_url = process_radarr_url(self.config['radarr_url'], self.config['radarr_api_key'])
+        return self.radarr_url
+
+    def fetch(self):
+        """Fetch all movies from Radarr"""
+        if self.radarr_url is None:
+            self.connect()
+        with self._stage('fetch'):
+            if self.settings['delta_sync']:
+                self.all_movies = self._sync_radarr()
+            else:
+                self.all_movies = get_radarr_movies(self.radarr_url, self.config['radarr_api_key'])
+        return self.all_movies
+
+    def _sync_radarr(self):
+        """Update the stored Radarr snapshot with the movies changed since the last sync
+
+        Falls back to a full fetch when there is no usable snapshot or the last full
+        sync is older than full_resync_hours. Changes that don't show up in the Radarr
+        history (e.g. new movies or updated release dates) are picked up by that full sync.
+        """
+        api_key = self.config['radarr_api_key']
+        snapshot_file = self._snapshot_file()
+        state = load_state(snapshot_file)
+        sync_time = datetime.now(timezone.utc)
+        
+        full_sync = True
+        if state and state.get('radarr_url') == self.radarr_url:
+            last_full_sync = datetime.fromisoformat(state['last_full_sync'])
+            full_sync = sync_time - last_full_sync >= timedelta(hours=self.settings['full_resync_hours'])
         
-        if future_movies:
-            print(f"{GREEN}Found {len(future_movies)} future movies releasing within {future_days_upcoming_movies} days:{RESET}")
-            for movie in future_movies:
-                release_info = f" - {movie['releaseType']} Release: {movie['releaseDate']}"
-                print(f"- {movie['title']}" + (f" ({movie['year']})" if movie['year'] else "") + release_info)
+        if full_sync:
+            print("Delta sync: full sync with Radarr")
+            movies = [{key: movie.get(key) for key in SNAPSHOT_FIELDS} for movie in get_radarr_movies(self.radarr_url, api_key)]
+            self.changed_ids = None
+            self.previous_movies = {}
+            last_full_sync = sync_time
         else:
-            print(f"{ORANGE}No future movies found releasing within {future_days_upcoming_movies} days.{RESET}")
-        
-        if released_movies:
-            print(f"\n{GREEN}Found {len(released_movies)} released movies not yet available:{RESET}")
-            for movie in released_movies:
-                release_info = f" - {movie['releaseType']} Released: {movie['releaseDate']}"
-                print(f"- {movie['title']}" + (f" ({movie['year']})" if movie['year'] else "") + release_info)
-        elif not future_only:
-            print(f"{ORANGE}No released movies found that are not yet available.{RESET}")
-        
-        # ---- Create Placeholder Videos ----
-        all_movies = future_movies + released_movies
-        if all_movies:
-            print(f"\n{BLUE}Creating placeholder videos...{RESET}")
-            successful_creates = 0
-            failed_creates = 0
-            
-            for movie in all_movies:
-                if create_placeholder_video(movie, config, debug):
-                    successful_creates += 1
+            movies_by_id = {movie['id']: movie for movie in state['movies']}
+            history = get_radarr_history_since(self.radarr_url, api_key, datetime.fromisoformat(state['last_sync']))
+            self.changed_ids = {record['movieId'] for record in history if record.get('movieId')}
+            self.previous_movies = {}
+            for movie_id in self.changed_ids:
+                self.previous_movies[movie_id] = movies_by_id.get(movie_id)
+                movie = get_radarr_movie(self.radarr_url, api_key, movie_id)
+                if movie is None:
+                    movies_by_id.pop(movie_id, None)
                 else:
-                    failed_creates += 1
+                    movies_by_id[movie_id] = {key: movie.get(key) for key in SNAPSHOT_FIELDS}
+            movies = list(movies_by_id.values())
+            print(f"Delta sync: {len(self.changed_ids)} movie(s) changed in Radarr since {state['last_sync']}")
+        
+        # Without changes the stored snapshot is still valid, and querying the history from
+        # its older last_sync returns the same records, so a no-op run writes nothing
+        if not self.dry_run and (full_sync or self.changed_ids):
+            self._pending_state[snapshot_file] = {
+                'radarr_url': self.radarr_url,
+                'last_sync': sync_time.isoformat(),
+                'last_full_sync': last_full_sync.isoformat(),
+                'movies': movies,
+            }
+        return movies
+
+    def _snapshot_file(self):
+        url_hash = hashlib.sha1(self.radarr_url.encode('utf-8')).hexdigest()[:8]
+        return self.state_folder / f"radarr_snapshot_{url_hash}.json"
+
+    def save_sync_state(self, succeeded=None):
+        """Store the delta sync snapshot and classification once the run has been applied
+
+        If an operation failed (by default: in this pipeline's apply()), the snapshot is
+        dropped instead, so the next run does a full sync and retries it. Radarr's history
+        wouldn't report that movie again.
+        """
+        if succeeded is None:
+            succeeded = not self.failed_operations
+        pending, self._pending_state = self._pending_state, {}
+        if not pending:
+            return
+        if succeeded:
+            for path, data in pending.items():
+                if load_state(path) != data:
+                    save_state(path, data)
+        else:
+            print(f"{ORANGE}Delta sync: not all changes could be applied, the next run does a full sync{RESET}")
+            self._snapshot_file().unlink(missing_ok=True)
+
+    def classify(self):
+        """Split the fetched movies into future and released movies"""
+        if self.all_movies is None:
+            self.fetch()
+        settings = self.settings
+        now = datetime.now(timezone.utc)
+        with self._stage('classify'):
+            classified_file = self.state_folder / f"classified_{self.name}.json"
+            classified_settings = {key: settings[key] for key in
+                                   ('future_days_upcoming_movies', 'utc_offset', 'future_only', 'include_inCinemas')}
+            previous = None
+            if settings['delta_sync'] and self.changed_ids is not None:
+                previous = load_state(classified_file)
             
-            print(f"\n{GREEN}Placeholder creation summary:{RESET}")
-            print(f"Successful: {successful_creates}")
-            print(f"Failed: {failed_creates}")
+            # The stored classification is only valid for the same settings and until its next transition
+            if previous and previous['settings'] == classified_settings and (
+                    previous['next_transition'] is None or now < datetime.fromisoformat(previous['next_transition'])):
+                self._classify_changed(previous, now)
+            else:
+                self.delta_ids = None
+                self.cleanup_paths = None
+                self.result.future_movies, self.result.released_movies = classify_movies(
+                    self.all_movies, settings['future_days_upcoming_movies'], settings['utc_offset'],
+                    settings['future_only'], settings['include_inCinemas'], settings['debug'], now
+                )
+                self.result.next_transition = find_next_transition(
+                    self.all_movies, settings['future_days_upcoming_movies'], settings['utc_offset'],
+                    settings['include_inCinemas'], now
+                )
+            
+            if settings['delta_sync'] and not self.dry_run:
+                next_transition = self.result.next_transition
+                self._pending_state[classified_file] = {
+                    'settings': classified_settings,
+                    'future': self.result.future_movies,
+                    'released': self.result.released_movies,
+                    'next_transition': next_transition.isoformat() if next_transition else None,
+                }
+        self._classified = True
+        return self.result.future_movies, self.result.released_movies
+
+    def _classify_changed(self, previous, now):
+        """Reclassify only the movies changed since the last sync, on top of the stored classification"""
+        settings = self.settings
+        changed_ids = self.changed_ids
+        changed_movies = [movie for movie in self.all_movies if movie.get('id') in changed_ids]
+        future_movies, released_movies = classify_movies(
+            changed_movies, settings['future_days_upcoming_movies'], settings['utc_offset'],
+            settings['future_only'], settings['include_inCinemas'], settings['debug'], now
+        )
+        
+        # Keep Radarr's order, as a full classification would
+        order = {movie.get('id'): index for index, movie in enumerate(self.all_movies)}
+        def merge(stored, changed):
+            movies = [movie for movie in stored if movie.get('id') not in changed_ids] + changed
+            return sorted(movies, key=lambda movie: order.get(movie.get('id'), len(order)))
+        self.result.future_movies = merge(previous['future'], future_movies)
+        self.result.released_movies = merge(previous['released'], released_movies)
+        
+        transitions = [datetime.fromisoformat(previous['next_transition'])] if previous['next_transition'] else []
+        changed_transition = find_next_transition(
+            changed_movies, settings['future_days_upcoming_movies'], settings['utc_offset'],
+            settings['include_inCinemas'], now
+        )
+        if changed_transition:
+            transitions.append(changed_transition)
+        self.result.next_transition = min(transitions) if transitions else None
+        
+        # Only the Coming Soon folders of changed movies (before and after the sync) need attention
+        path_mappings = self.config.get('path_mapping', {})
+        self.delta_ids = set(changed_ids)
+        self.cleanup_paths = set()
+        for movie in changed_movies + [movie for movie in self.previous_movies.values() if movie]:
+            coming_soon_path = get_coming_soon_path(movie, path_mappings)
+            if coming_soon_path:
+                self.cleanup_paths.add(str(coming_soon_path))
+
+    def _plan_placeholders(self, plan):
+        """Plan the placeholders of the classified movies (only the changed ones after a delta sync)"""
+        journal = self._journal()
+        source_file = self.resolve_source_video()
+        for movie in self.result.future_movies + self.result.released_movies:
+            if self.delta_ids is not None and movie.get('id') not in self.delta_ids:
+                continue
+            operation = plan_placeholder_video(movie, self.config, source_file, journal, self.settings['debug'])
+            if operation['action'] == 'error':
+                plan.errors.append(operation)
+            elif operation['action'] == 'keep':
+                plan.keep.append(operation)
+            else:
+                plan.create.append(operation)
+
+    def _plan_cleanup(self, plan):
+        """Plan the removal of placeholders that are no longer needed"""
+        if self.cleanup_paths is not None:
+            print(f"Delta sync: checking {len(self.cleanup_paths)} Coming Soon folder(s) of changed movies")
+        plan.remove, plan.checked = plan_placeholder_cleanup(
+            self.config, self.result.future_movies, self.result.released_movies, self.all_movies,
+            self.settings['debug'], self.keep_paths, self.cleanup_paths
+        )
+
+    def _plan_yaml(self, plan):
+        """Plan the Kometa overlay and collection YAML files, skipping unchanged ones"""
+        config = self.config
+        future_movies, released_movies = self.result.future_movies, self.result.released_movies
+        self.result.overlay_file = self.kometa_folder / "UMFK_MOVIES_UPCOMING_OVERLAYS.yml"
+        self.result.collection_file = self.kometa_folder / "UMFK_MOVIES_UPCOMING_COLLECTION.yml"
         
-        # ---- Cleanup Placeholder Videos ----
+        overlay_yaml = build_overlay_yaml(future_movies, released_movies,
+                                          {"backdrop_future": config.get("backdrop_upcoming_movies_future", {}),
+                                           "text_future": config.get("text_upcoming_movies_future", {}),
+                                           "backdrop_released": config.get("backdrop_upcoming_movies_released", {}),
+                                           "text_released": config.get("text_upcoming_movies_released", {})})
+        collection_yaml = build_collection_yaml(future_movies, released_movies, config)
+        
+        for output_file, content in ((self.result.overlay_file, overlay_yaml), (self.result.collection_file, collection_yaml)):
+            operation = plan_file_write(output_file, content)
+            if operation:
+                plan.write.append(operation)
+
+    def _journal(self):
+        if self._placeholder_journal is None:
+            self._placeholder_journal = PlaceholderJournal(self.state_folder / 'placeholder_journal.jsonl')
+        return self._placeholder_journal
+
+    def plan(self, placeholders=True, cleanup=None, render=True):
+        """Compute everything this run wants to change on disk, without changing anything
+
+        Planning only reads the filesystem, so in pipelined mode the parts are planned concurrently.
+        Movies are fetched and classified first if that hasn't happened yet.
+        """
+        if not self._classified:
+            self.classify()
+        if cleanup is None:
+            cleanup = self.settings['cleanup']
+        plan = Plan()
+        planners = []
+        if placeholders and (self.result.future_movies or self.result.released_movies):
+            planners.append(('plan_placeholders', self._plan_placeholders))
         if cleanup:
-            print(f"\n{BLUE}Checking for placeholders to cleanup...{RESET}")
-            cleanup_placeholder_videos(radarr_url, radarr_api_key, config, future_movies, released_movies, debug)
+            planners.append(('plan_cleanup', self._plan_cleanup))
+        elif self.settings['debug']:
+            print(f"{BLUE}[DEBUG] Placeholder cleanup is disabled{RESET}")
+        if render:
+            planners.append(('plan_render', self._plan_yaml))
+        
+        def run_planner(name, planner):
+            with self._stage(name):
+                planner(plan)
+        
+        if self.settings['pipelined'] and len(planners) > 1:
+            with ThreadPoolExecutor(max_workers=len(planners)) as executor:
+                futures = [executor.submit(run_planner, name, planner) for name, planner in planners]
+            for future in futures:
+                future.result()
         else:
+            for name, planner in planners:
+                run_planner(name, planner)
+        
+        self.result.plan = plan
+        return plan
+
+    def _apply_batch(self, batch):
+        """Apply the operations of one mount, folder by folder; returns the successful operations"""
+        journal = self._journal()
+        debug = self.settings['debug']
+        done = []
+        for parent_dir, operations in batch:
             if debug:
-                print(f"{BLUE}[DEBUG] Placeholder cleanup is disabled{RESET}")
+                print(f"{BLUE}[DEBUG] Applying {len(operations)} operation(s) in {parent_dir}{RESET}")
+            for operation in operations:
+                if operation['action'] == 'remove':
+                    ok = apply_removal(operation, debug)
+                elif operation['action'] == 'write':
+                    ok = apply_file_write(operation)
+                else:
+                    ok = apply_placeholder_operation(operation, journal)
+                if ok:
+                    done.append(operation)
+        return done
+
+    def _apply_operations(self, plan, operations):
+        """Apply operations batched per mount and folder, concurrently per mount in pipelined mode"""
+        batches = list(plan.batches(operations).values())
+        done = []
+        if self.settings['pipelined'] and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+                for batch_done in executor.map(self._apply_batch, batches):
+                    done.extend(batch_done)
+        else:
+            for batch in batches:
+                done.extend(self._apply_batch(batch))
+        return done
+
+    def apply(self, plan=None):
+        """Carry out a plan (by default a full plan of this run)
+
+        Removals, placeholder creations and .yml writes are applied in that order, each as its
+        own stage and batched per mount and folder. In pipelined mode different mounts are
+        handled concurrently. A plan without changes doesn't write to the library or the Kometa folder.
+        """
+        if plan is None:
+            plan = self.plan()
+        journal = self._journal()
+        
+        if plan.is_noop:
+            print(f"\n{GREEN}Nothing to change ({len(plan.keep)} placeholder(s) up to date){RESET}")
+        else:
+            print(f"\n{BLUE}Applying changes: {len(plan.create)} placeholder(s) to create, "
+                  f"{len(plan.remove)} to remove, {len(plan.write)} file(s) to write...{RESET}")
+        
+        done = []
+        if plan.checked is not None:
+            with self._stage('cleanup'):
+                done.extend(self._apply_operations(plan, plan.remove))
+        if plan.create or plan.keep or plan.errors:
+            with self._stage('placeholders'):
+                done.extend(self._apply_operations(plan, plan.create))
+                # Placeholders that were complete but not yet in the journal
+                for operation in plan.keep:
+                    if apply_placeholder_operation(operation, journal):
+                        done.append(operation)
+                for operation in plan.errors:
+                    apply_placeholder_operation(operation, journal)
+        if plan.write:
+            with self._stage('render'):
+                done.extend(self._apply_operations(plan, plan.write))
+        try:
+            journal.compact()
+        except OSError as e:
+            # Only an optimization, the next run compacts it again
+            print(f"{ORANGE}Could not compact the placeholder journal: {e}{RESET}")
+        
+        done_ids = {id(operation) for operation in done}
+        self.failed_operations += (len(plan.remove) + len(plan.create) + len(plan.keep) + len(plan.write)
+                                   - len(done) + len(plan.errors))
+        if plan.create or plan.keep or plan.errors:
+            successful = sum(1 for operation in plan.create + plan.keep if id(operation) in done_ids)
+            self.result.placeholders = {'successful': successful, 'failed': len(plan.create) + len(plan.keep) + len(plan.errors) - successful}
+            print(f"\n{GREEN}Placeholder creation summary:{RESET}")
+            print(f"Successful: {self.result.placeholders['successful']}")
+            print(f"Failed: {self.result.placeholders['failed']}")
+        if plan.checked is not None:
+            removed = sum(1 for operation in plan.remove if id(operation) in done_ids)
+            self.result.cleanup = {'removed': removed, 'checked': plan.checked}
+            print_cleanup_summary(removed, plan.checked, self.settings['debug'])
+        return self.result
+
+    def create_placeholders(self):
+        """Create placeholder videos for all classified movies"""
+        return self.apply(self.plan(placeholders=True, cleanup=False, render=False)).placeholders
+
+    def cleanup(self):
+        """Remove placeholders that are no longer needed"""
+        return self.apply(self.plan(placeholders=False, cleanup=True, render=False)).cleanup
+
+    def render(self):
+        """Write the Kometa overlay and collection YAML files"""
+        self.apply(self.plan(placeholders=False, cleanup=False, render=True))
+        return self.result.overlay_file, self.result.collection_file
+
+    def prepare(self):
+        """Check the video file and fetch Radarr, concurrently in pipelined mode"""
+        if not self.settings['pipelined']:
+            self.check_video()
+            self.fetch()
+            return
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            video_check = executor.submit(self.check_video)
+            fetch = executor.submit(self.fetch)
+        video_check.result()
+        fetch.result()
+
+    def write_report(self):
+        """Write a JSON report of the run next to the Kometa YAML files"""
+        result = self.result
+        report = {
+            'version': VERSION,
+            'profile': self.name,
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'future_movies': len(result.future_movies),
+            'released_movies': len(result.released_movies),
+            'placeholders': result.placeholders,
+            'cleanup': result.cleanup,
+            'next_transition': result.next_transition.isoformat() if result.next_transition else None,
+            'runtime_seconds': result.runtime.total_seconds() if result.runtime else None,
+            'stages': result.stages,
+        }
+        report_file = self.kometa_folder / "UMFK_RUN_REPORT.json"
+        result.report_file = report_file
+        
+        # A run that changed nothing doesn't write anything, unless the report itself changed
+        if result.plan and result.plan.is_noop:
+            previous = load_state(report_file)
+            volatile = ('generated_at', 'runtime_seconds', 'stages')
+            if previous and all(previous.get(key) == value for key, value in report.items() if key not in volatile):
+                return report_file
+        
+        self.kometa_folder.mkdir(parents=True, exist_ok=True)
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report_file
+
+    def coming_soon_paths(self):
+        """Coming Soon folders wanted by the classified movies"""
+        path_mappings = self.config.get('path_mapping', {})
+        paths = (get_coming_soon_path(movie, path_mappings)
+                 for movie in self.result.future_movies + self.result.released_movies)
+        return {str(path) for path in paths if path}
+
+    def placeholder_removals(self):
+        """Real movie folder -> 'remove' operation for each existing placeholder of the classified movies"""
+        path_mappings = self.config.get('path_mapping', {})
+        removals = {}
+        for movie in self.result.future_movies + self.result.released_movies:
+            coming_soon_path = get_coming_soon_path(movie, path_mappings)
+            if coming_soon_path and coming_soon_path.is_dir():
+                removals[Path(map_path(movie['path'], path_mappings))] = {
+                    'action': 'remove', 'title': movie['title'], 'folder': coming_soon_path,
+                    'reason': "movie has been downloaded"}
+        return removals
+
+    def run(self):
+        """Run all stages and return a PipelineResult
+
+        With dry_run the run stops after planning; the plan is in result.plan.
+        """
+        start_time = datetime.now()
+        self.prepare()
+        self.classify()
+        if self.dry_run:
+            self.plan()
+            return self.result
+        self.apply()
+        self.save_sync_state()
+        self.result.runtime = datetime.now() - start_time
+        self.write_report()
+        return self.result
+
+def load_profiles(config_paths, base_dir=None, pipelined=None, dry_run=False):
+    """Create one pipeline per config file
+
+    With several profiles, each one writes to Kometa/<config name> unless it sets kometa_folder.
+    """
+    pipelines = []
+    for config_path in config_paths:
+        pipeline = UMFKPipeline.from_file(config_path, base_dir, pipelined)
+        pipeline.dry_run = dry_run
+        if len(config_paths) > 1 and 'kometa_folder' not in pipeline.config:
+            pipeline.kometa_folder = pipeline.kometa_folder / pipeline.name
+        pipelines.append(pipeline)
+    
+    kometa_folders = [pipeline.kometa_folder.resolve() for pipeline in pipelines]
+    if len(set(kometa_folders)) != len(kometa_folders):
+        raise ConfigError("Each profile needs its own kometa_folder")
+    return pipelines
+
+def run_profiles(pipelines):
+    """Run several pipelines, fetching each Radarr instance only once
+
+    All profiles are classified before anything is applied, so the cleanup of one
+    profile keeps the placeholders wanted by the others.
+    """
+    multiple = len(pipelines) > 1
+    snapshots = {}
+    runtimes = {}
+    for pipeline in pipelines:
+        start_time = datetime.now()
+        if multiple:
+            print(f"\n{BOLD}{BLUE}==== Profile: {pipeline.name} ===={RESET}")
+        if pipeline.radarr_key in snapshots:
+            pipeline.check_video()
+            pipeline.use_snapshot(*snapshots[pipeline.radarr_key])
+            print(f"Reusing Radarr snapshot ({len(pipeline.all_movies)} movies)")
+        else:
+            pipeline.prepare()
+            snapshots[pipeline.radarr_key] = pipeline.snapshot()
+        
+        print_settings(pipeline.settings)
         
-        # ---- Create Kometa subfolder ----
-        kometa_folder = Path(__file__).parent / "Kometa"
-        kometa_folder.mkdir(exist_ok=True)
+        # ---- Find Upcoming Movies ----
+        print(f"{BLUE}Finding upcoming movies...{RESET}")
+        pipeline.classify()
+        print_movie_summary(pipeline.result, pipeline.settings)
+        print_next_transition(pipeline.result, pipeline.settings)
+        runtimes[id(pipeline)] = datetime.now() - start_time
+    
+    wanted_paths = set()
+    for pipeline in pipelines:
+        wanted_paths |= pipeline.coming_soon_paths()
+    
+    # ---- Create Placeholder Videos, Cleanup and Create YAML Files ----
+    for pipeline in pipelines:
+        pipeline.keep_paths = wanted_paths
+        if pipeline.dry_run:
+            print_plan(pipeline.plan(), pipeline.name if multiple else None)
+            continue
         
-        # ---- Create YAML Files ----
-        overlay_file = kometa_folder / "UMFK_MOVIES_UPCOMING_OVERLAYS.yml"
-        collection_file = kometa_folder / "UMFK_MOVIES_UPCOMING_COLLECTION.yml"
+        if multiple:
+            print(f"\n{BOLD}{BLUE}==== Applying profile: {pipeline.name} ===={RESET}")
+        start_time = datetime.now()
+        pipeline.apply()
+        pipeline.result.runtime = runtimes[id(pipeline)] + (datetime.now() - start_time)
+        pipeline.write_report()
+        if pipeline.result.plan.write:
+            print(f"\n{GREEN}YAML files created successfully in {pipeline.kometa_folder}{RESET}")
+        else:
+            print(f"\n{GREEN}YAML files in {pipeline.kometa_folder} are up to date{RESET}")
+    
+    # A Radarr snapshot is shared, so a failure in any profile means a full sync for all of them
+    failed_keys = {pipeline.radarr_key for pipeline in pipelines if pipeline.failed_operations}
+    for pipeline in pipelines:
+        if not pipeline.dry_run:
+            pipeline.save_sync_state(pipeline.radarr_key not in failed_keys)
+    return [pipeline.result for pipeline in pipelines]
+
+def print_settings(settings):
+    """Print the general settings"""
+    print(f"future_days_upcoming_movies: {settings['future_days_upcoming_movies']}")
+    print(f"UTC offset: {settings['utc_offset']} hours")
+    print(f"future_only: {settings['future_only']}")
+    print(f"include_inCinemas: {settings['include_inCinemas']}")
+    print(f"cleanup: {settings['cleanup']}")
+    print(f"pipelined: {settings['pipelined']}")
+    print(f"debug: {settings['debug']}\n")
+
+def print_movie_summary(result, settings):
+    """Print the classified movies"""
+    future_days_upcoming_movies = settings['future_days_upcoming_movies']
+    if result.future_movies:
+        print(f"{GREEN}Found {len(result.future_movies)} future movies releasing within {future_days_upcoming_movies} days:{RESET}")
+        for movie in result.future_movies:
+            release_info = f" - {movie['releaseType']} Release: {movie['releaseDate']}"
+            print(f"- {movie['title']}" + (f" ({movie['year']})" if movie['year'] else "") + release_info)
+    else:
+        print(f"{ORANGE}No future movies found releasing within {future_days_upcoming_movies} days.{RESET}")
+    
+    if result.released_movies:
+        print(f"\n{GREEN}Found {len(result.released_movies)} released movies not yet available:{RESET}")
+        for movie in result.released_movies:
+            release_info = f" - {movie['releaseType']} Released: {movie['releaseDate']}"
+            print(f"- {movie['title']}" + (f" ({movie['year']})" if movie['year'] else "") + release_info)
+    elif not settings['future_only']:
+        print(f"{ORANGE}No released movies found that are not yet available.{RESET}")
+
+def format_local_time(utc_time, utc_offset):
+    """Format a UTC datetime in the configured UTC offset"""
+    local_time = utc_time + timedelta(hours=utc_offset)
+    return f"{local_time.strftime('%Y-%m-%d %H:%M:%S')} (UTC{utc_offset:+g})"
+
+def print_next_transition(result, settings):
+    """Print when the output of this profile will change next"""
+    if result.next_transition:
+        print(f"\nNext change expected at: {format_local_time(result.next_transition, settings['utc_offset'])}")
+    else:
+        print("\nNo upcoming release date changes the output")
+
+def print_stage_stats(pipeline):
+    """Print the duration and memory use of each stage"""
+    print(f"\n{BLUE}Stage breakdown ({pipeline.name}):{RESET}")
+    for name, stats in pipeline.result.stages.items():
+        line = f"- {name}: {stats['seconds'] * 1000:.1f} ms"
+        if 'peak_kb' in stats:
+            line += f", peak traced memory {stats['peak_kb']:.1f} KB"
+        print(line)
+        for allocation in stats.get('top_allocations', []):
+            print(f"    {allocation}")
+
+def print_http_timings():
+    """Print the timing breakdown of the recorded Radarr requests"""
+    print(f"\n{BLUE}Radarr HTTP timings (ms):{RESET}")
+    print(f"{'dns':>8} {'connect':>8} {'tls':>8} {'ttfb':>8} {'download':>9} {'bytes':>10}  url")
+    for timing in http_timings.records:
+        print(f"{timing['dns'] * 1000:8.1f} {timing['connect'] * 1000:8.1f} {timing['tls'] * 1000:8.1f} "
+              f"{timing['ttfb'] * 1000:8.1f} {timing['download'] * 1000:9.1f} {timing['bytes']:10d}  {timing['url']}")
+
+def print_diagnostics(args, pipelines):
+    """Print the --trace-memory and --http-timing reports of a run and reset the HTTP timings"""
+    if args.trace_memory:
+        for pipeline in pipelines:
+            print_stage_stats(pipeline)
+    if args.http_timing:
+        print_http_timings()
+        http_timings.reset()
+
+def format_runtime(runtime):
+    """Format a timedelta as HH:MM:SS"""
+    hours, remainder = divmod(runtime.total_seconds(), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Upcoming Movies for Kometa")
+    parser.add_argument("--config", nargs="+",
+                        help="Path to the config file (default: config/config.yml). "
+                             "Pass several files to run multiple profiles over one Radarr fetch")
+    parser.add_argument("--pipelined", action="store_true", default=None,
+                        help="Run independent stages concurrently (overrides 'pipelined' in the config)")
+    parser.add_argument("--schedule", action="store_true",
+                        help="Keep running and rerun exactly when the output is expected to change")
+    parser.add_argument("--watch", action="store_true",
+                        help="Between runs, remove a placeholder as soon as its movie file lands (Linux only, implies --schedule)")
+    parser.add_argument("--max-interval", type=float, default=6, metavar="HOURS",
+                        help="In --schedule mode, rerun at least this often to pick up changes in Radarr (default: 6)")
+    parser.add_argument("--profile", nargs="?", const=str(SCRIPT_DIR / "UMFK.pstats"), metavar="FILE",
+                        help="Profile the run with cProfile and write the stats to FILE (default: UMFK.pstats)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Report peak memory and top allocations per stage using tracemalloc")
+    parser.add_argument("--http-timing", action="store_true",
+                        help="Report a DNS/connect/TLS/TTFB/download breakdown of the Radarr requests")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the placeholders to create, keep and remove and the .yml files to write, without changing anything")
+    return parser.parse_args(argv)
+
+def run_scheduler(args, pipelines):
+    """Rerun all profiles at their next transition, or after --max-interval hours"""
+    while True:
+        start_time = datetime.now()
+        next_transition = None
+        failed = False
+        try:
+            results = run_profiles(pipelines)
+            transitions = [result.next_transition for result in results if result.next_transition]
+            next_transition = min(transitions) if transitions else None
+            print(f"Total runtime: {format_runtime(datetime.now() - start_time)}")
+        except (UMFKError, ConnectionError, OSError) as e:
+            # e.g. Radarr or a share being briefly unavailable, try again soon
+            print(f"{RED}Error: {str(e)}{RESET}")
+            failed = True
+        except Exception as e:
+            print(f"{RED}Unexpected error: {str(e)}{RESET}")
+            failed = True
+        print_diagnostics(args, pipelines)
         
-        create_overlay_yaml(str(overlay_file), future_movies, released_movies,
-                          {"backdrop_future": config.get("backdrop_upcoming_movies_future", {}),
-                           "text_future": config.get("text_upcoming_movies_future", {}),
-                           "backdrop_released": config.get("backdrop_upcoming_movies_released", {}),
-                           "text_released": config.get("text_upcoming_movies_released", {})})
+        now = datetime.now(timezone.utc)
+        next_run = now + timedelta(hours=args.max_interval)
+        if failed:
+            next_run = min(next_run, now + SCHEDULE_RETRY)
+        elif next_transition and next_transition + SCHEDULE_MARGIN < next_run:
+            next_run = next_transition + SCHEDULE_MARGIN
+        sleep_seconds = max(SCHEDULE_MIN_SLEEP, (next_run - now).total_seconds())
         
-        create_collection_yaml(str(collection_file), future_movies, released_movies, config)
+        utc_offset = pipelines[0].settings['utc_offset']
+        print(f"\n{BLUE}Next run at {format_local_time(now + timedelta(seconds=sleep_seconds), utc_offset)}{RESET}")
+        if args.watch:
+            watch_placeholders(pipelines, sleep_seconds, dry_run=args.dry_run)
+        else:
+            time.sleep(sleep_seconds)
         
-        print(f"\n{GREEN}YAML files created successfully in Kometa folder{RESET}")
+        # Reload the profiles so config changes are picked up
+        try:
+            pipelines = load_profiles(args.config or [None], pipelined=args.pipelined, dry_run=args.dry_run)
+        except Exception as e:
+            print(f"{RED}Could not reload the config, keeping the previous one: {str(e)}{RESET}")
+            pipelines = [pipeline.fresh_copy() for pipeline in pipelines]
+
+def main(argv=None):
+    args = parse_args(argv)
+    start_time = datetime.now()
+    print(f"{BLUE}{'*' * 44}\n{'*' * 5} Upcoming Movies for Kometa {VERSION} {'*' * 5}\n{'*' * 44}{RESET}")
+    
+    update_executor = None
+    profiler = None
+    if args.profile:
+        # cProfile only sees the calling thread, so run everything in it
+        if args.pipelined is not False:
+            print(f"{ORANGE}--profile: pipelined mode is disabled so all stages show up in the profile{RESET}")
+        args.pipelined = False
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if args.trace_memory:
+        tracemalloc.start()
+    http_timings.enabled = args.http_timing
+    try:
+        pipelines = load_profiles(args.config or [None], pipelined=args.pipelined, dry_run=args.dry_run)
         
-        # Calculate and display runtime
-        end_time = datetime.now()
-        runtime = end_time - start_time
-        hours, remainder = divmod(runtime.total_seconds(), 3600)
-        minutes, seconds = divmod(remainder, 60)
-        runtime_formatted = f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
+        if any(pipeline.settings['pipelined'] for pipeline in pipelines):
+            # The update check is independent of everything else, let it run alongside the fetch
+            update_executor = ThreadPoolExecutor(max_workers=1)
+            update_executor.submit(check_for_updates)
+        else:
+            check_for_updates()
         
-        print(f"Total runtime: {runtime_formatted}")
+        if args.schedule or args.watch:
+            run_scheduler(args, pipelines)
+        else:
+            run_profiles(pipelines)
+            
+            if update_executor:
+                update_executor.shutdown(wait=True)
+            
+            print_diagnostics(args, pipelines)
+            
+            # Calculate and display runtime
+            print(f"Total runtime: {format_runtime(datetime.now() - start_time)}")
         
+    except KeyboardInterrupt:
+        print(f"\n{ORANGE}Stopped{RESET}")
     except ConnectionError as e:
         print(f"{RED}Error: {str(e)}{RESET}")
         sys.exit(1)
+    except UMFKError as e:
+        print(f"{RED}{str(e)}{RESET}")
+        sys.exit(1)
     except Exception as e:
         print(f"{RED}Unexpected error: {str(e)}{RESET}")
         sys.exit(1)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"\n{BLUE}Profile written to {args.profile} (top functions by cumulative time):{RESET}")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()